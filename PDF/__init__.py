@@ -13,13 +13,22 @@ from .utils import (
     convert_png_to_jpg,
     create_valid_folder,
     copy_copyright_file,
-    delete_file
+    delete_file,
+    update_book_report
 )
 
 from .pdf_generator import (
     generate_pdf,
     create_book_pdf,
-    delete_source_pdfs
+    delete_source_pdfs,
+    optimize_pdf
+)
+
+from .epub_generator import generate_epub
+
+from .layout import (
+    estimate_height, estimate_pages, page_fill_ratio,
+    words_per_page, chapter_page_ranges
 )
 
 from .content_generator import (
@@ -37,16 +46,50 @@ from .models import (
     ContentPageSchema
 )
 
-from .main import create_ebook, main
+from .usage import (
+    BookBudget, UsageTracker, BudgetExceeded,
+    estimate_tokens
+)
+
+from .responses import (
+    ResponseError, repair_json, parse_response,
+    send_structured
+)
+
+from .scheduler import Stage, run_stages, schedule_report
+
+from .session import ChatSession
+
+from .prefix_cache import PrefixCache
+
+from .backends import (
+    GeminiBackend, LocalBackend, StubBackend, Router,
+    DEFAULT_ROUTES, routes_from_env
+)
+
+from .hedging import (
+    CallTimeout, LatencyHistogram, HedgePolicy,
+    DEFAULT_POLICY, call_hedged
+)
 
 __all__ = [
     'convert_svg_to_png', 'convert_png_to_jpg', 'create_valid_folder',
-    'copy_copyright_file', 'delete_file',
-    'generate_pdf', 'create_book_pdf', 'delete_source_pdfs',
+    'copy_copyright_file', 'delete_file', 'update_book_report',
+    'generate_pdf', 'create_book_pdf', 'delete_source_pdfs', 'optimize_pdf',
+    'generate_epub',
+    'estimate_height', 'estimate_pages', 'page_fill_ratio',
+    'words_per_page', 'chapter_page_ranges',
     'generate_ebook_idea', 'generate_cover_svg', 'generate_ebook_content',
     'generate_content_page',
     'Chapter', 'FinalRecipe', 'HeadRecipe', 'ThinkerRecipe',
     'CoverHeadRecipe', 'ConfigRecipe', 'CoverPageRecipe',
     'eBookRecipe', 'eBookRecipPages', 'eBookRecipPage', 'ContentPageSchema',
-    'create_ebook', 'main'
+    'BookBudget', 'UsageTracker', 'BudgetExceeded', 'estimate_tokens',
+    'ResponseError', 'repair_json', 'parse_response',
+    'send_structured',
+    'Stage', 'run_stages', 'schedule_report',
+    'ChatSession', 'PrefixCache',
+    'GeminiBackend', 'LocalBackend', 'StubBackend', 'Router', 'DEFAULT_ROUTES', 'routes_from_env',
+    'CallTimeout', 'LatencyHistogram', 'HedgePolicy',
+    'DEFAULT_POLICY', 'call_hedged'
 ] 
\ No newline at end of file
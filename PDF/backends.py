@@ -0,0 +1,262 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import os
+import json
+import time
+import threading
+import urllib.request
+from types import SimpleNamespace
+from google import genai
+
+from .hedging import DEFAULT_POLICY
+from .session import ChatSession
+
+DEFAULT_LOCAL_URL = "http://localhost:8080"
+
+# Backend and model of every stage, as "backend/model"
+DEFAULT_ROUTES = {
+    "default": "gemini/gemini-2.0-flash",
+    "idea_head": "gemini/gemini-1.5-flash",
+    "idea_thinker": "gemini/gemini-1.5-flash",
+    "cover": "gemini/gemini-2.0-flash",
+    "content_head": "gemini/gemini-2.0-flash",
+    "writer": "gemini/gemini-2.0-flash",
+    "fact_checker": "gemini/gemini-2.0-flash",
+    "suggester": "gemini/gemini-2.0-flash",
+    "contents": "gemini/gemini-2.0-flash",
+}
+
+# Cheap, high-volume stages that go to the local model when LOCAL_LLM_URL is set
+LOCAL_STAGES = ("idea_thinker", "cover")
+
+def _timeout():
+    # Requests give up shortly after the call deadline
+    return DEFAULT_POLICY.deadline + 30
+
+class GeminiBackend:
+    """
+    Google Gemini through the google-genai client.
+
+    Args:
+        api_key (str, optional): API key. Default is GEMINI_API_KEY.
+        timeout (float, optional): HTTP timeout in seconds. Default is the call deadline plus 30s.
+    """
+
+    name = "gemini"
+    supports_caching = True
+
+    def __init__(self, api_key=None, timeout=None):
+        self.client = genai.Client(api_key=api_key or os.getenv("GEMINI_API_KEY"),
+                                   http_options={"timeout": int((timeout or _timeout()) * 1000)})
+
+    def generate(self, model, contents, config=None):
+        """
+        Generate a response for a conversation.
+
+        Args:
+            model (str): Model name.
+            contents (list): Turns as {"role": "user"/"model", "parts": [{"text": ...}]}.
+            config (dict, optional): Generation config, e.g. response_schema.
+
+        Returns:
+            The response, with .text and .usage_metadata.
+        """
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    def create_cache(self, model, system_instruction, ttl):
+        """Create a context cache and return its name."""
+        return self.client.caches.create(model=model, config={
+            "system_instruction": system_instruction,
+            "ttl": ttl,
+        }).name
+
+    def delete_cache(self, name):
+        self.client.caches.delete(name=name)
+
+class LocalBackend:
+    """
+    A local model server with an OpenAI-compatible chat completions API,
+    such as the llama.cpp server.
+
+    Response schemas are sent as a json_schema response format, which the
+    server turns into a grammar, so structured output is enforced while
+    decoding.
+
+    Args:
+        base_url (str, optional): Server URL. Default is LOCAL_LLM_URL or http://localhost:8080.
+        timeout (float, optional): HTTP timeout in seconds. Default is the call deadline plus 30s.
+    """
+
+    name = "local"
+    # The server reuses its KV cache for shared prefixes instead of named caches
+    supports_caching = False
+
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or os.getenv("LOCAL_LLM_URL") or DEFAULT_LOCAL_URL).rstrip("/")
+        self.timeout = timeout or _timeout()
+
+    def generate(self, model, contents, config=None):
+        """
+        Generate a response for a conversation.
+
+        Args:
+            model (str): Model name, passed through to the server.
+            contents (list): Turns as {"role": "user"/"model", "parts": [{"text": ...}]}.
+            config (dict, optional): Generation config, e.g. response_schema.
+
+        Returns:
+            The response, with .text and .usage_metadata.
+        """
+        config = config or {}
+        messages = []
+        if config.get("system_instruction"):
+            messages.append({"role": "system", "content": config["system_instruction"]})
+        for turn in contents:
+            messages.append({
+                "role": "assistant" if turn["role"] == "model" else "user",
+                "content": "".join(part.get("text", "") for part in turn["parts"]),
+            })
+
+        # Reuse the server's KV cache for the shared history prefix
+        body = {"model": model, "messages": messages, "cache_prompt": True}
+        if config.get("temperature") is not None:
+            body["temperature"] = config["temperature"]
+        schema = config.get("response_schema")
+        if schema is not None:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema(), "strict": True},
+            }
+
+        request = urllib.request.Request(f"{self.base_url}/v1/chat/completions",
+                                         data=json.dumps(body).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            result = json.load(response)
+
+        usage = result.get("usage") or {}
+        return SimpleNamespace(
+            text=result["choices"][0]["message"].get("content") or "",
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=usage.get("prompt_tokens"),
+                candidates_token_count=usage.get("completion_tokens"),
+                cached_content_token_count=None,
+            ),
+        )
+
+class StubBackend:
+    """
+    Canned responses with injected latency, to exercise deadlines and
+    hedging without the network.
+
+    Args:
+        respond (callable, optional): Called with (model, contents, config), returns the response text. Default is "{}".
+        latencies (list, optional): Seconds each call sleeps, in call order; later calls reuse the last value. Default is no delay.
+    """
+
+    name = "stub"
+    supports_caching = False
+
+    def __init__(self, respond=None, latencies=(0,)):
+        self.respond = respond
+        self.latencies = list(latencies) or [0]
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model, contents, config=None):
+        with self._lock:
+            n = self.calls
+            self.calls += 1
+        time.sleep(self.latencies[min(n, len(self.latencies) - 1)])
+        text = self.respond(model, contents, config) if self.respond else "{}"
+        # No usage metadata, the tracker estimates the tokens
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "local": LocalBackend,
+}
+
+def routes_from_env():
+    """
+    Build the routing table from the environment.
+
+    LOCAL_LLM_URL sends the LOCAL_STAGES to the local model named by
+    LOCAL_LLM_MODEL. LLM_ROUTES then overrides single stages, e.g.
+    "writer=gemini/gemini-2.0-flash,suggester=local/qwen2.5-3b".
+
+    Returns:
+        dict: "backend/model" for every stage.
+    """
+    routes = dict(DEFAULT_ROUTES)
+    local_model = os.getenv("LOCAL_LLM_MODEL") or "local"
+    if os.getenv("LOCAL_LLM_URL"):
+        for stage in LOCAL_STAGES:
+            routes[stage] = f"local/{local_model}"
+
+    for item in (os.getenv("LLM_ROUTES") or "").split(","):
+        stage, _, spec = item.partition("=")
+        stage, spec = stage.strip(), spec.strip()
+        if not stage or not spec:
+            continue
+        if "/" not in spec:
+            # A bare backend name keeps that backend's usual model
+            spec = f"local/{local_model}" if spec == "local" else DEFAULT_ROUTES.get(stage, DEFAULT_ROUTES["default"])
+        routes[stage] = spec
+    return routes
+
+class Router:
+    """
+    Routing table from pipeline stage to backend and model.
+
+    Backends are created on first use and shared by all sessions of the
+    router.
+
+    Args:
+        routes (dict, optional): "backend/model" by stage. Default is routes_from_env().
+        backends (dict, optional): Backend instances by name, e.g. a stub for offline runs.
+    """
+
+    def __init__(self, routes=None, backends=None):
+        self.routes = routes if routes is not None else routes_from_env()
+        self.backends = dict(backends or {})
+        self._lock = threading.Lock()
+
+    def backend(self, name):
+        with self._lock:
+            if name not in self.backends:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown LLM backend: {name}")
+                self.backends[name] = BACKENDS[name]()
+            return self.backends[name]
+
+    def route(self, stage):
+        """
+        Backend and model for a stage.
+
+        Args:
+            stage (str): Stage name, e.g. "writer".
+
+        Returns:
+            tuple: (backend, model name)
+        """
+        spec = self.routes.get(stage) or self.routes.get("default") or DEFAULT_ROUTES["default"]
+        name, _, model = spec.partition("/")
+        return self.backend(name), model
+
+    def session(self, stage, role="", preamble="", cache=None):
+        """
+        Start a chat session on the backend the stage is routed to.
+
+        Args:
+            stage (str): Stage name, e.g. "writer".
+            role (str, optional): Role name of the session. Default is the stage name.
+            preamble (str, optional): Static text the conversation starts with.
+            cache (PrefixCache, optional): Cache to look the preamble up in.
+
+        Returns:
+            ChatSession: The new session.
+        """
+        backend, model = self.route(stage)
+        return ChatSession(backend, model, role or stage, preamble, cache)
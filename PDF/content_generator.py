@@ -2,8 +2,6 @@
 # Licensed under the MIT License. See LICENSE file in the project root for full license information.
 # Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
 import os
-import json
-from google import genai
 from dotenv import load_dotenv
 
 from .models import (
@@ -12,83 +10,146 @@ from .models import (
     eBookRecipe, eBookRecipPages, eBookRecipPage,
     ContentPageSchema
 )
+from .responses import send_structured
+from .prefix_cache import PrefixCache
+from .backends import Router
+from .pdf_generator import DEFAULT_FONT_SIZE
+from .layout import page_fill_ratio, words_per_page, OVERFLOW_RATIO, UNDERFILL_RATIO
 
 # Load environment variables
 load_dotenv()
 
-def generate_ebook_idea(Custom_Prompt=""):
+# Page format as generate_pdf actually renders it
+PAGE_SPEC = f"Page Size: A4 and Font Size: {DEFAULT_FONT_SIZE} (about {words_per_page()} words per page)"
+
+# Role personas, sent as the static preamble of each session
+IDEA_HEAD_PERSONA = ("You are the head of a thinkers group, working on creating an eBook. Your team will decide the title, content, and page distribution. Once finalized, confirm the details.")
+THINKER_PERSONA = "You are {name}, follow the orders of your HEAD."
+COVER_PERSONA = ("You are the head of an editorial team, selecting a cover design for a PDF. "
+                 "Choose one from the available templates and update it with the given title under 30 characters and author name under 20 characters.")
+HEAD_PERSONA = ("Your Name is Head or Mr. Jake Thompson. You are the head of an editorial team, creating a PDF eBook. "
+                "You will be given a title, author, and a list of chapters with their titles and content. "
+                "You have a writer that will write the content of the eBook page. "
+                "You have a fact checker that will check the content of the eBook page. "
+                "You have a suggester that will suggest the content of the eBook page. "
+                "You have a 3 employee team that will help you to generate the eBook. You have to only give them tasks and they will do it. "
+                "Generate the entire eBook in Markdown format, ensuring it is well-structured and visually appealing.")
+WRITER_PERSONA = ("Your Name is eBookAura Writer or Mrs. Emily Carter.You are the writer of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
+                  "You have to write the content of the eBook page. "
+                  "You have to write the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
+FACT_CHECKER_PERSONA = ("Your Name is eBookAura Fact Checker or Mr. Brandon Mitchell. You are the fact checker of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
+                        "You have to check the content of the eBook page. "
+                        "You have to check the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
+SUGGESTER_PERSONA = ("Your Name is eBookAura Suggester or Mrs. Sophia Reynolds. You are the suggester of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
+                     "You have to suggest the content of the eBook page. "
+                     "You have to suggest the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
+CONTENTS_PERSONA = ("Your Name is Head or Mr. Jake Thompson. You are responsible for generating the content page "
+                    "of a PDF eBook. Your task is to create a well-structured contents in Markdown format, "
+                    "listing chapter names and corresponding page numbers."
+                    "You are provided with the number of pages used per chapter and you have to properly arrange the chapters in the content page by there page numbers.")
+
+def _fit_pages(head, chapter, pages, tracker=None, chapter_index=None):
+    """
+    Trim overflowing pages and extend underfilled ones.
+    
+    Only pages the layout estimator flags are sent back to the head, once
+    each. The last page of a chapter may be short and is never extended.
+    
+    Args:
+        head: Head chat that wrote the chapter.
+        chapter (dict): Chapter with title, content, and pages.
+        pages (list): eBookRecipPages of the chapter.
+        tracker (UsageTracker, optional): Tracker for token usage and budget.
+        chapter_index (int, optional): Chapter index, for usage accounting.
+        
+    Returns:
+        list: The fitted eBookRecipPages.
+    """
+    fitted = []
+    for n, page in enumerate(pages, start=1):
+        ratio = page_fill_ratio(page.page_markdown)
+        if ratio > OVERFLOW_RATIO:
+            instruction = "It overflows, shorten it so it fits on one page."
+        elif ratio < UNDERFILL_RATIO and n < len(pages):
+            instruction = "It is mostly empty, continue the content so it fills the page."
+        else:
+            fitted.append(page)
+            continue
+        
+        print(f"Page {n} of {chapter['title']} fills {ratio:.0%} of a page, refitting")
+        refit = send_structured(head, head.model, f"{PAGE_SPEC}\nChapter: {chapter['title']}\nPage {n}/{len(pages)} fills about {ratio:.0%} of an A4 page. {instruction} Keep the same Markdown style and return only this page.\n\n{page.page_markdown}",
+                                eBookRecipPages, tracker=tracker, stage="page_fit", chapter=chapter_index)
+        
+        # Keep whichever version is closer to a full page without overflowing
+        refit_ratio = page_fill_ratio(refit.page_markdown)
+        if refit_ratio <= OVERFLOW_RATIO and abs(1 - refit_ratio) < abs(1 - ratio):
+            page = refit
+        fitted.append(page)
+    return fitted
+
+def generate_ebook_idea(Custom_Prompt="", tracker=None, router=None):
     """
     Generate an eBook idea with title, content, and page distribution.
     
     Args:
         Custom_Prompt (str, optional): Custom prompt for the eBook idea. Default is empty string.
+        tracker (UsageTracker, optional): Tracker for token usage and budget. Default is None.
+        router (Router, optional): Routing table from stage to LLM backend. Default is Router().
         
     Returns:
         dict: The final eBook idea with title, contents, and total pages.
     """
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    router = router or Router()
 
-    head = client.chats.create(model="gemini-1.5-flash")
-    thinker1 = client.chats.create(model="gemini-1.5-flash")
-    thinker2 = client.chats.create(model="gemini-1.5-flash")
-    thinker3 = client.chats.create(model="gemini-1.5-flash")
+    head = router.session("idea_head", "head", IDEA_HEAD_PERSONA)
+    thinker1 = router.session("idea_thinker", "thinker 1", THINKER_PERSONA.format(name="thinker 1"))
+    thinker2 = router.session("idea_thinker", "thinker 2", THINKER_PERSONA.format(name="thinker 2"))
+    thinker3 = router.session("idea_thinker", "thinker 3", THINKER_PERSONA.format(name="thinker 3"))
 
     thinks = 0
     isBookIdeaConformed = False
     history = []
     final_response_ = {}
 
-    # Instructions
-    head.send_message("You are the head of a thinkers group, working on creating an eBook. Your team will decide the title, content, and page distribution. Once finalized, confirm the details.")
-    thinker1.send_message("You are thinker 1, follow the orders of your HEAD.")
-    thinker2.send_message("You are thinker 2, follow the orders of your HEAD.")
-    thinker3.send_message("You are thinker 3, follow the orders of your HEAD.")
-
     # Start Task
-    head_response = json.loads(head.send_message(f"Now command your thinkers to decide on an eBook topic. {Custom_Prompt}", config={
-        "response_mime_type": "application/json",
-        "response_schema": HeadRecipe,
-    }).text)
+    head_response = send_structured(head, head.model, f"Now command your thinkers to decide on an eBook topic. {Custom_Prompt}", HeadRecipe, tracker=tracker, stage="idea_head")
 
-    history.append(f"HEAD: {head_response['response']}")
-    print(f"HEAD: {head_response['response']}")
+    history.append(f"HEAD: {head_response.response}")
+    print(f"HEAD: {head_response.response}")
 
     while not isBookIdeaConformed and thinks <= 10:
+        # Stop the debate early once the budget is running low
+        if tracker is not None and tracker.check("idea") == "degrade":
+            tracker.note("skip_thinker_rounds", "idea", f"after {thinks} rounds")
+            break
+
         thinks += 1
         for thinker in [thinker1, thinker2, thinker3]:
-            response = json.loads(thinker.send_message(f'Thinks Remaining: {thinks}/10\nHistory: {history}', config={
-                "response_mime_type": "application/json",
-                "response_schema": ThinkerRecipe,
-            }).text)
-            history.append(f"{thinker}: {response['response']}")
-            print(f"{thinker}: {response['response']}")
-
-        head_response = json.loads(head.send_message(f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nConfirm the eBook details if ready, otherwise guide the thinkers further.', config={
-            "response_mime_type": "application/json",
-            "response_schema": HeadRecipe,
-        }).text)
-
-        history.append(f"HEAD: {head_response['response']}")
-        print(f"HEAD: {head_response['response']}")
-        isBookIdeaConformed = head_response['isBookIdeaConformed']
+            response = send_structured(thinker, thinker.model, f'Thinks Remaining: {thinks}/10\nHistory: {history}', ThinkerRecipe, tracker=tracker, stage="idea_thinker")
+            history.append(f"{thinker}: {response.response}")
+            print(f"{thinker}: {response.response}")
+
+        head_response = send_structured(head, head.model, f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nConfirm the eBook details if ready, otherwise guide the thinkers further.', HeadRecipe, tracker=tracker, stage="idea_head")
+
+        history.append(f"HEAD: {head_response.response}")
+        print(f"HEAD: {head_response.response}")
+        isBookIdeaConformed = head_response.isBookIdeaConformed
 
         if isBookIdeaConformed:
-            final_response_ = json.loads(head.send_message(f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nProvide the final eBook details in JSON format.', config={
-                "response_mime_type": "application/json",
-                "response_schema": FinalRecipe,
-            }).text)
+            final_response_ = send_structured(head, head.model, f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nProvide the final eBook details in JSON format.', FinalRecipe, tracker=tracker, stage="idea_head").model_dump()
             print(f"Final Response: {final_response_}")
+            if tracker is not None:
+                final_response_ = tracker.clamp_recipe(final_response_)
             return final_response_
 
-    final_response_ = json.loads(head.send_message(f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nForcefully generate the final eBook details.', config={
-        "response_mime_type": "application/json",
-        "response_schema": FinalRecipe,
-    }).text)
+    final_response_ = send_structured(head, head.model, f'Thinks Remaining: {thinks}/10\nHistory: {history}\n\nForcefully generate the final eBook details.', FinalRecipe, tracker=tracker, stage="idea_head").model_dump()
     print(f"Final Response: {final_response_}")
+    if tracker is not None:
+        final_response_ = tracker.clamp_recipe(final_response_)
 
     return final_response_
 
-def generate_cover_svg(title, author, Custom_Prompt=""):
+def generate_cover_svg(title, author, Custom_Prompt="", tracker=None, router=None):
     """
     Generate an SVG cover for the eBook.
     
@@ -96,39 +157,39 @@ def generate_cover_svg(title, author, Custom_Prompt=""):
         title (str): Title of the eBook.
         author (str): Author of the eBook.
         Custom_Prompt (str, optional): Custom prompt for cover generation. Default is empty string.
+        tracker (UsageTracker, optional): Tracker for token usage and budget. Default is None.
+        router (Router, optional): Routing table from stage to LLM backend. Default is Router().
         
     Returns:
         str: SVG content for the cover.
     """
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    router = router or Router()
 
-    head = client.chats.create(model="gemini-2.0-flash")
+    head = router.session("cover", "head", COVER_PERSONA)
 
     # Load SVG templates
     templates_dir = "./Templates"
     svg_templates = {str(i): open(os.path.join(templates_dir, f"{i}.svg")).read() for i in range(1, 11)}
 
-    # Instructions
-    head.send_message("You are the head of an editorial team, selecting a cover design for a PDF. "
-                      "Choose one from the available templates and update it with the given title under 30 characters and author name under 20 characters.")
-
     # Provide available templates
-    head_response = json.loads(head.send_message(
+    head_response = send_structured(head, head.model,
         f"Here are the available SVG cover templates:\n{list(svg_templates.keys())}\n"
         f"Choose one and update its title and author name. {Custom_Prompt}",
-        config={"response_mime_type": "application/json", "response_schema": CoverHeadRecipe}
-    ).text)
+        CoverHeadRecipe,
+        tracker=tracker, stage="cover"
+    )
 
-    selected_template = head_response["selected_template"]
+    selected_template = head_response.selected_template
 
     # Provide short title and author strings
-    head_response = json.loads(head.send_message(
+    head_response = send_structured(head, head.model,
         f"Title: {title}\nAuthor: {author}\nMax Title Length: 20 characters\nMax Author Length: 15 characters\nProvide the short title and author name in JSON format.",
-        config={"response_mime_type": "application/json", "response_schema": ConfigRecipe}
-    ).text)
+        ConfigRecipe,
+        tracker=tracker, stage="cover"
+    )
 
-    title = head_response["title"]
-    author = head_response["author"]
+    title = head_response.title
+    author = head_response.author
 
     # Update SVG template
     updated_svg = svg_templates[selected_template].replace("Your Title Here", title).replace("Author Name", author)
@@ -136,151 +197,133 @@ def generate_cover_svg(title, author, Custom_Prompt=""):
     # Return final SVG
     return updated_svg
 
-def generate_ebook_content(author, data, Custom_Prompt=""):
+def generate_ebook_content(author, data, Custom_Prompt="", tracker=None, router=None):
     """
     Generate the content for each chapter of the eBook.
     
+    When the tracker's budget starts running low, the remaining chapters are
+    clamped to the degraded page limit and written by the writer alone,
+    without the suggester and fact checker.
+    
+    Each session starts with its role persona as a preamble instead of a
+    setup call, and only the book-level head also gets the outline. A
+    preamble long enough for the provider's context cache is cached once
+    per book; shorter ones are folded into the session's first message.
+    
     Args:
         author (str): Author of the eBook.
         data (dict): Data structure containing eBook details.
         Custom_Prompt (str, optional): Custom prompt for content generation. Default is empty string.
+        tracker (UsageTracker, optional): Tracker for token usage and budget. Default is None.
+        router (Router, optional): Routing table from stage to LLM backend. Default is Router().
         
     Returns:
         list: List of chapter markdown content.
+        
+    Raises:
+        BudgetExceeded: If the tracker's hard budget is reached.
     """
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    router = router or Router()
+    # Personas and the book outline are sent once per book, not once per chapter
+    cache = PrefixCache()
+    head_preamble = f"{HEAD_PERSONA}\n\nTitle: {data['title']}\nAuthor: {author}\nChapters: {data['contents']}"
+    try:
+        return _write_chapters(router, cache, head_preamble, data, tracker)
+    finally:
+        print(f"Prefix cache: {cache.report()}")
+        cache.clear()
+
+def _write_chapters(router, cache, head_preamble, data, tracker=None):
+    """Run the editorial team over every chapter, see generate_ebook_content."""
+    head = router.session("content_head", "head", head_preamble, cache)
 
-    head = client.chats.create(model="gemini-2.0-flash")
-    
-    head.send_message("Your Name is Head or Mr. Jake Thompson. You are the head of an editorial team, creating a PDF eBook. "
-                      "You will be given a title, author, and a list of chapters with their titles and content. "
-                      "You have a writer that will write the content of the eBook page. "
-                      "You have a fact checker that will check the content of the eBook page. "
-                      "You have a suggester that will suggest the content of the eBook page. "
-                      "You have a 3 employee team that will help you to generate the eBook. You have to only give them tasks and they will do it. "
-                      "Generate the entire eBook in Markdown format, ensuring it is well-structured and visually appealing.")
-    
     history = []
     headHistory = []
-    
-    head_response = json.loads(head.send_message(
-        f"""Title: {data['title']}\nAuthor: {author}\nChapters: {data['contents']}\nAnalyze the content. """
-        , config={
-        "response_mime_type": "application/json",
-        "response_schema": eBookRecipe,
-    }).text)
+
+    head_response = send_structured(head, head.model, "Analyze the content. ", eBookRecipe, tracker=tracker, stage="content_head")
     print(f"Head Response: {head_response}\n\n")
-    headHistory.append(f"HEAD: {head_response['response']}")
+    headHistory.append(f"HEAD: {head_response.response}")
 
-    history.append(f"HEAD: {head_response['response']}")
+    history.append(f"HEAD: {head_response.response}")
     chapters_markdown = []
 
-    for chapter in data['contents']:
-        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-        head = client.chats.create(model="gemini-2.0-flash")
-    
-        head.send_message("Your Name is Head or Mr. Jake Thompson. You are the head of an editorial team, creating a PDF eBook. "
-                        "You will be given a title, author, and a list of chapters with their titles and content. "
-                        "You have a writer that will write the content of the eBook page. "
-                        "You have a fact checker that will check the content of the eBook page. "
-                        "You have a suggester that will suggest the content of the eBook page. "
-                        "You have a 3 employee team that will help you to generate the eBook. You have to only give them tasks and they will do it. "
-                        "Generate the entire eBook in Markdown format, ensuring it is well-structured and visually appealing.")
-                        
-        history.append(f"HEAD: {head_response['response']}")
-        writer = client.chats.create(model="gemini-2.0-flash")
-        fact_checker = client.chats.create(model="gemini-2.0-flash")
-        suggester = client.chats.create(model="gemini-2.0-flash")
-        
-        writer.send_message("Your Name is eBookAura Writer or Mrs. Emily Carter.You are the writer of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
-                      "You have to write the content of the eBook page. "
-                      "You have to write the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
-    
-        fact_checker.send_message("Your Name is eBookAura Fact Checker or Mr. Brandon Mitchell. You are the fact checker of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
-                        "You have to check the content of the eBook page. "
-                        "You have to check the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
-        
-        suggester.send_message("Your Name is eBookAura Suggester or Mrs. Sophia Reynolds. You are the suggester of the eBook. You will be given a title, author, and a list of chapters with their titles and content. "
-                        "You have to suggest the content of the eBook page. "
-                        "You have to suggest the content of the eBook page in Markdown format, ensuring it is well-structured and visually appealing.")
-                        
-        head_response = json.loads(head.send_message(f"Page Size: A4 and Font Size: 22\nHead History: {headHistory}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nPages: {chapter['pages']}\nYou have to disscuss what to write for this chapter with fact checker and suggester. Now tell them what you think about this chapter, provide them with the content of the chapter to write. ", config={
-            "response_mime_type": "application/json",
-            "response_schema": eBookRecipPage,
-        }).text)
+    for c, chapter in enumerate(data['contents'], start=1):
+        # Degrade to a cheaper page strategy once the budget is running low
+        degraded = tracker is not None and tracker.check(f"chapter {c}") == "degrade"
+        pages = tracker.clamp_chapter_pages(chapter, c) if degraded else chapter['pages']
+        if degraded:
+            tracker.note("writer_only", "content", f"chapter {c}")
+
+        # The outline was analysed once above, chapter heads get the persona only
+        head = router.session("content_head", "head", HEAD_PERSONA, cache)
+
+        history.append(f"HEAD: {head_response.response}")
+        writer = router.session("writer", "writer", WRITER_PERSONA, cache)
+        if not degraded:
+            fact_checker = router.session("fact_checker", "fact_checker", FACT_CHECKER_PERSONA, cache)
+            suggester = router.session("suggester", "suggester", SUGGESTER_PERSONA, cache)
+
+        head_response = send_structured(head, head.model, f"{PAGE_SPEC}\nHead History: {headHistory}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nPages: {pages}\nYou have to disscuss what to write for this chapter with fact checker and suggester. Now tell them what you think about this chapter, provide them with the content of the chapter to write. ", eBookRecipPage, tracker=tracker, stage="content_head", chapter=c)
 
         print(f"Head Response: {head_response}\n\n")
-        headHistory.append(f"HEAD: {head_response['response']}")
-        
-        for i in range(chapter['pages'] + 1):
-            suggester_response = json.loads(suggester.send_message(f"Page Size: A4 and Font Size: 22\nPage: {i}/{chapter['pages']}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {chapter['pages']}\nYou have to suggest the content of the eBook page to the writer in Markdown format, ensuring it is well-structured and visually appealing. ", config={
-                "response_mime_type": "application/json",
-                "response_schema": eBookRecipe,
-            }).text)
-            print(f"Suggester Response: {suggester_response}\n\n")
-
-            history.append(f"SUGGESTER: {suggester_response['response']}")
-
-            fact_checker_response = json.loads(fact_checker.send_message(f"Page Size: A4 and Font Size: 22\nPage: {i}/{chapter['pages']}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {chapter['pages']}\nYou have to check the content of the eBook page to the fact checker in Markdown format, ensuring it is well-structured and visually appealing. ", config={
-                "response_mime_type": "application/json",
-                "response_schema": eBookRecipe,
-            }).text)
-            print(f"Fact Checker Response: {fact_checker_response}\n\n")
-            history.append(f"FACT_CHECKER: {fact_checker_response['response']}")
-            
-            writer_response = json.loads(writer.send_message(f"Page Size: A4 and Font Size: 22\nPage: {i}/{chapter['pages']}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {chapter['pages']}\nYou have to write the content of the eBook page to the writer in Markdown format, ensuring it is well-structured and visually appealing. ", config={
-                "response_mime_type": "application/json",
-                "response_schema": eBookRecipe,
-            }).text)
+        headHistory.append(f"HEAD: {head_response.response}")
+
+        for i in range(pages + 1):
+            if tracker is not None:
+                tracker.check(f"chapter {c} page {i}")
+
+            if not degraded:
+                suggester_response = send_structured(suggester, suggester.model, f"{PAGE_SPEC}\nPage: {i}/{pages}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {pages}\nYou have to suggest the content of the eBook page to the writer in Markdown format, ensuring it is well-structured and visually appealing. ", eBookRecipe, tracker=tracker, stage="suggester", chapter=c)
+                print(f"Suggester Response: {suggester_response}\n\n")
+
+                history.append(f"SUGGESTER: {suggester_response.response}")
+
+                fact_checker_response = send_structured(fact_checker, fact_checker.model, f"{PAGE_SPEC}\nPage: {i}/{pages}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {pages}\nYou have to check the content of the eBook page to the fact checker in Markdown format, ensuring it is well-structured and visually appealing. ", eBookRecipe, tracker=tracker, stage="fact_checker", chapter=c)
+                print(f"Fact Checker Response: {fact_checker_response}\n\n")
+                history.append(f"FACT_CHECKER: {fact_checker_response.response}")
+
+            writer_response = send_structured(writer, writer.model, f"{PAGE_SPEC}\nPage: {i}/{pages}\nHistory: {history}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nMAX_Pages: {pages}\nYou have to write the content of the eBook page to the writer in Markdown format, ensuring it is well-structured and visually appealing. ", eBookRecipe, tracker=tracker, stage="writer", chapter=c)
             print(f"Writer Response: {writer_response}\n\n")
-            history.append(f"WRITER: {writer_response['response']}")
-        
-        head_response = json.loads(head.send_message(f"Page Size: A4 and Font Size: 22\nChapter: {chapter['title']}\nContent: {chapter['content']}\nPages: {chapter['pages']}\nThe writer has written the content of the eBook current chapter. Now you have to generate the Markdown format of the current chapter. Now generate the Markdown format content for each pages in the chapter as writer has written. Chapter Pages Used: {chapter['pages']} ", config={
-            "response_mime_type": "application/json",
-            "response_schema": eBookRecipPage,
-        }).text)
+            history.append(f"WRITER: {writer_response.response}")
+
+        head_response = send_structured(head, head.model, f"{PAGE_SPEC}\nChapter: {chapter['title']}\nContent: {chapter['content']}\nPages: {pages}\nThe writer has written the content of the eBook current chapter. Now you have to generate the Markdown format of the current chapter. Now generate the Markdown format content for each pages in the chapter as writer has written. Chapter Pages Used: {pages} ", eBookRecipPage, tracker=tracker, stage="content_head", chapter=c)
         print(f"Head Response: {head_response}\n\n")
-        chapters_markdown.append(head_response['chapter_markdown'])
+        chapter_pages = head_response.chapter_markdown
+        if not degraded:
+            chapter_pages = _fit_pages(head, chapter, chapter_pages, tracker, c)
+        chapters_markdown.append([page.model_dump() for page in chapter_pages])
         history = []
 
     return chapters_markdown
 
-def generate_content_page(prompt, font_size=20):
+def generate_content_page(prompt, font_size=20, tracker=None, router=None):
     """
     Generate the table of contents page in markdown format.
     
     Args:
         prompt (str): Prompt for content page generation.
         font_size (int, optional): Font size for the content page. Default is 20.
+        tracker (UsageTracker, optional): Tracker for token usage and budget. Default is None.
+        router (Router, optional): Routing table from stage to LLM backend. Default is Router().
         
     Returns:
         str: Markdown content for the table of contents.
     """
-    # Initialize the AI client
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    # Route the stage to its backend
+    router = router or Router()
 
     # Create Head agent
-    head = client.chats.create(model="gemini-2.0-flash")
-
-    # Define the Head's role
-    head.send_message(
-        "Your Name is Head or Mr. Jake Thompson. You are responsible for generating the content page "
-        "of a PDF eBook. Your task is to create a well-structured contents in Markdown format, "
-        "listing chapter names and corresponding page numbers."
-        "You are provided with the number of pages used per chapter and you have to properly arrange the chapters in the content page by there page numbers."
-    )
+    head = router.session("contents", "head", CONTENTS_PERSONA)
 
     # Request Markdown-formatted table of contents based on the prompt
-    head_response = json.loads(head.send_message(
+    head_response = send_structured(head, head.model,
         f"Generate the contents page for the eBook based on the following prompt:\n\n{prompt}\n"
         f"Font Size Used: {font_size} and Page Size: A4\n"
         "Ensure the content page is structured properly in Markdown format, listing chapter names and "
         "use this format, for eg: Chapter 1: This is the chapter 1............... Pg. 1-2 "
         "don't use any table format or anything else, just use this format, this should be a markdown plain text not any link or anything else, just plain text but styled one.",
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": ContentPageSchema,
-        }
-    ).text)
+        ContentPageSchema,
+        tracker=tracker, stage="contents"
+    )
 
-    return head_response["markdown"] 
\ No newline at end of file
+    return head_response.markdown
@@ -0,0 +1,192 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import os
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from html import escape
+from html.parser import HTMLParser
+import markdown
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+EPUB_CSS = """body { margin: 5%; text-align: justify; line-height: 1.6; }
+h1 { text-align: center; }
+img.cover { display: block; max-width: 100%; height: auto; margin: 0 auto; }
+pre, code { white-space: pre-wrap; }
+"""
+
+# Elements kept from the rendered HTML, with the attributes they may carry
+XHTML_TAGS = {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd",
+    "blockquote", "pre", "code", "em", "strong", "b", "i", "u", "s", "del", "ins", "sub", "sup",
+    "mark", "small", "abbr", "span", "div", "table", "caption", "thead", "tbody", "tfoot", "tr",
+    "th", "td", "img", "a", "figure", "figcaption",
+}
+XHTML_ATTRS = {"href", "src", "alt", "title", "colspan", "rowspan", "start"}
+VOID_TAGS = {"br", "hr", "img"}
+# Elements dropped together with their content
+SKIPPED_TAGS = {"script", "style", "head", "title"}
+
+class _XhtmlWriter(HTMLParser):
+    """
+    Rewrite HTML, including raw HTML from the markdown, as well-formed XHTML.
+
+    Known elements are kept, void elements are self-closed, elements left
+    open are closed and unknown tags are dropped while keeping their text,
+    so the EPUB shows the same content as the PDF.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+            return
+        if self.skipping or tag not in XHTML_TAGS:
+            return
+        attributes = "".join(f' {name}="{escape(value or "", quote=True)}"'
+                             for name, value in attrs if name in XHTML_ATTRS)
+        if tag in VOID_TAGS:
+            self.out.append(f"<{tag}{attributes}/>")
+        else:
+            self.out.append(f"<{tag}{attributes}>")
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in XHTML_TAGS and tag not in VOID_TAGS and not self.skipping:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+            return
+        if self.skipping or tag not in self.open:
+            return
+        # Close anything left open inside this element
+        while self.open:
+            name = self.open.pop()
+            self.out.append(f"</{name}>")
+            if name == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.out.append(escape(data, quote=False))
+
+    def xhtml(self):
+        self.close()
+        return "".join(self.out) + "".join(f"</{name}>" for name in reversed(self.open))
+
+def _to_xhtml(html):
+    writer = _XhtmlWriter()
+    writer.feed(html)
+    return writer.xhtml()
+
+def _xhtml_page(title, body):
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head>
+  <title>{escape(title)}</title>
+  <link rel="stylesheet" type="text/css" href="style.css"/>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+def generate_epub(title, author, book_content, output_path, chapter_titles=None, cover_path=None):
+    """
+    Writes an EPUB 3 book directly from the generated chapter markdown.
+
+    Each chapter becomes one XHTML document. The archive is streamed to
+    disk entry by entry, without rendering anything.
+
+    Args:
+        title (str): Title of the eBook.
+        author (str): Author of the eBook.
+        book_content (list): Chapters as returned by generate_ebook_content.
+        output_path (str): Path for the output EPUB file.
+        chapter_titles (list, optional): Title for each chapter, used in the navigation. Default is "Chapter N".
+        cover_path (str, optional): Path to the cover JPEG. Default is no cover.
+
+    Returns:
+        bool: True if the EPUB was written, False otherwise.
+    """
+    try:
+        book_id = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, title)}"
+        modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        has_cover = cover_path is not None and os.path.exists(cover_path)
+
+        manifest = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+                    '<item id="css" href="style.css" media-type="text/css"/>']
+        spine = []
+        nav_items = []
+
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as epub:
+            # The mimetype must be the first entry and stored uncompressed
+            epub.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            epub.writestr("META-INF/container.xml", CONTAINER_XML)
+            epub.writestr("OEBPS/style.css", EPUB_CSS)
+
+            if has_cover:
+                epub.write(cover_path, "OEBPS/images/cover.jpg")
+                epub.writestr("OEBPS/cover.xhtml", _xhtml_page(
+                    title, f'<img class="cover" src="images/cover.jpg" alt="{escape(title)}"/>'))
+                manifest.append('<item id="cover-image" href="images/cover.jpg" media-type="image/jpeg" properties="cover-image"/>')
+                manifest.append('<item id="cover" href="cover.xhtml" media-type="application/xhtml+xml"/>')
+                spine.append('<itemref idref="cover"/>')
+
+            for c, chapter in enumerate(book_content, start=1):
+                chapter_markdown = "\n\n".join(page['page_markdown'] for page in chapter)
+                chapter_title = chapter_titles[c - 1] if chapter_titles and c <= len(chapter_titles) else f"Chapter {c}"
+                body = _to_xhtml(markdown.markdown(chapter_markdown, output_format="xhtml"))
+
+                epub.writestr(f"OEBPS/chapter-{c}.xhtml", _xhtml_page(chapter_title, body))
+                manifest.append(f'<item id="chapter-{c}" href="chapter-{c}.xhtml" media-type="application/xhtml+xml"/>')
+                spine.append(f'<itemref idref="chapter-{c}"/>')
+                nav_items.append(f'<li><a href="chapter-{c}.xhtml">{escape(chapter_title)}</a></li>')
+
+            nav_body = ('<nav epub:type="toc" id="toc">\n<h1>Contents</h1>\n<ol>\n'
+                        + "\n".join(nav_items) + '\n</ol>\n</nav>')
+            epub.writestr("OEBPS/nav.xhtml", _xhtml_page("Contents", nav_body))
+
+            newline = "\n    "
+            epub.writestr("OEBPS/content.opf", f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">{book_id}</dc:identifier>
+    <dc:title>{escape(title)}</dc:title>
+    <dc:creator>{escape(author)}</dc:creator>
+    <dc:language>en</dc:language>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+    {newline.join(manifest)}
+  </manifest>
+  <spine>
+    {newline.join(spine)}
+  </spine>
+</package>
+""")
+
+        print(f"EPUB created successfully: {output_path}")
+        return True
+
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        return False
@@ -0,0 +1,214 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Calls that miss their deadline keep running here until the HTTP timeout
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-call")
+
+class CallTimeout(TimeoutError):
+    """Raised when a model call does not return within its deadline."""
+
+class LatencyHistogram:
+    """
+    Recent latencies of the calls made by one role.
+
+    Args:
+        size (int, optional): Number of recent samples to keep. Default is 200.
+    """
+
+    def __init__(self, size=200):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q):
+        """
+        Latency below which a fraction q of the recent calls returned.
+
+        Args:
+            q (float): Quantile between 0 and 1, e.g. 0.95.
+
+        Returns:
+            float: Latency in seconds, or None without samples.
+        """
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class HedgePolicy:
+    """
+    Deadlines and hedging limits for model calls, with live latency histograms per role.
+
+    A call that has not returned within the `hedge_quantile` latency of its
+    role gets a duplicate request, as long as hedges have used less than
+    `max_hedge_ratio` of the book's tokens and cost so far, as metered by
+    the tracker. Calls made without a tracker fall back to a share of calls.
+
+    The policy is shared by all books so the histograms keep learning;
+    counters() and report(since=...) give the numbers of a single book.
+
+    Args:
+        deadline (float, optional): Seconds before a call fails with CallTimeout. Default is 180.
+        hedge_quantile (float, optional): Latency quantile that triggers a hedge. Default is 0.95.
+        max_hedge_ratio (float, optional): Maximum share of the book's spend, or of calls without a tracker, that hedges may use. Default is 0.1.
+        min_samples (int, optional): Samples a role needs before it is hedged. Default is 10.
+    """
+
+    def __init__(self, deadline=180, hedge_quantile=0.95, max_hedge_ratio=0.1, min_samples=10):
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.histograms = {}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def histogram(self, role):
+        with self._lock:
+            return self.histograms.setdefault(role, LatencyHistogram())
+
+    def hedge_after(self, role):
+        """
+        Seconds after which a call of this role should be hedged.
+
+        Returns:
+            float: Threshold in seconds, or None if the role is not hedged yet.
+        """
+        histogram = self.histogram(role)
+        if self.max_hedge_ratio <= 0 or len(histogram.samples) < self.min_samples:
+            return None
+        return histogram.quantile(self.hedge_quantile)
+
+    def try_hedge(self, tracker=None):
+        """
+        Reserve a hedge if the hedge budget allows it.
+
+        Args:
+            tracker (UsageTracker, optional): Tracker of the book, whose hedge spend is checked.
+
+        Returns:
+            bool: True if the hedge may be sent.
+        """
+        with self._lock:
+            if tracker is not None:
+                allowed = tracker.hedge_share() < self.max_hedge_ratio
+            else:
+                allowed = self.hedges + 1 <= self.max_hedge_ratio * self.calls
+            if allowed:
+                self.hedges += 1
+            return allowed
+
+    def counters(self):
+        """Current call, hedge and timeout counts, to report a single book against."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "timeouts": self.timeouts,
+            }
+
+    def report(self, since=None):
+        """
+        Build the latency section of the book report.
+
+        Args:
+            since (dict, optional): counters() taken when the book started. Default is the whole run.
+
+        Returns:
+            dict: Call, hedge and timeout counts since then, and the current p95 latency per role.
+        """
+        counters = self.counters()
+        if since:
+            counters = {name: value - since.get(name, 0) for name, value in counters.items()}
+        with self._lock:
+            return {
+                **counters,
+                "p95_seconds": {
+                    role: round(histogram.quantile(0.95), 3)
+                    for role, histogram in self.histograms.items() if histogram.samples
+                },
+            }
+
+DEFAULT_POLICY = HedgePolicy()
+
+def call_hedged(attempt, role, policy=None, tracker=None):
+    """
+    Run a model call with a deadline, hedging it when it is slow.
+
+    `attempt` is called with hedge=False for the first request and
+    hedge=True for the duplicate. It should return only once the response
+    is valid; the first attempt to return wins and an attempt that raises
+    does not end the call while another one is still running.
+
+    Args:
+        attempt (callable): Function making one request.
+        role (str): Role of the call, e.g. "writer", used for its latency histogram.
+        policy (HedgePolicy, optional): Policy to apply. Default is DEFAULT_POLICY.
+        tracker (UsageTracker, optional): Tracker of the book, bounds the spend on hedges.
+
+    Returns:
+        The result of the winning attempt.
+
+    Raises:
+        CallTimeout: If no attempt returns within the deadline.
+    """
+    policy = policy or DEFAULT_POLICY
+    with policy._lock:
+        policy.calls += 1
+
+    start = time.perf_counter()
+    deadline = start + policy.deadline
+    hedge_at = policy.hedge_after(role)
+    futures = {_executor.submit(attempt, hedge=False): False}
+    hedged = False
+    error = None
+
+    while True:
+        now = time.perf_counter()
+        wake = deadline
+        if not hedged and hedge_at is not None:
+            wake = min(deadline, start + hedge_at)
+
+        done, _ = wait(futures, timeout=max(0, wake - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            is_hedge = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            policy.histogram(role).add(time.perf_counter() - start)
+            if is_hedge:
+                with policy._lock:
+                    policy.hedge_wins += 1
+            return result
+
+        now = time.perf_counter()
+        if now >= deadline:
+            with policy._lock:
+                policy.timeouts += 1
+            # The slow call is a latency sample too, so the thresholds adapt
+            policy.histogram(role).add(now - start)
+            raise CallTimeout(f"{role} call did not return within {policy.deadline}s")
+
+        if not hedged and hedge_at is not None and now >= start + hedge_at:
+            hedged = True
+            if policy.try_hedge(tracker):
+                print(f"Hedging {role} call after {now - start:.1f}s")
+                futures[_executor.submit(attempt, hedge=True)] = True
+
+        if not futures:
+            raise error
@@ -0,0 +1,244 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+from html.parser import HTMLParser
+import markdown
+
+from .pdf_generator import DEFAULT_FONT_SIZE, PAGE_PADDING_MM, LINE_HEIGHT
+
+# wkhtmltopdf lays out an A4 page as 992 x 1403 CSS px (0.6pt per px),
+# while CSS mm are converted at 96 dpi
+PAGE_WIDTH_PX = 992
+PAGE_HEIGHT_PX = 1403
+PX_PER_MM = 96 / 25.4
+
+# Line height of elements without an explicit line-height
+NORMAL_LINE_HEIGHT = 1.15
+
+# Average glyph widths in em of the default serif font (Times New Roman)
+NARROW_CHARS = set("ijlt.,;:'!|fI()[]")
+WIDE_CHARS = set("mwMW")
+MONOSPACE_WIDTH = 0.6
+
+# Default browser styles as (font size in em, margin in em, left indent in px)
+BLOCK_STYLES = {
+    "p": (1.0, 1.0, 0),
+    "h1": (None, 0.67, 0),
+    "h2": (1.5, 0.83, 0),
+    "h3": (1.17, 1.0, 0),
+    "h4": (1.0, 1.33, 0),
+    "h5": (0.83, 1.67, 0),
+    "h6": (0.67, 2.33, 0),
+    "li": (1.0, 0.0, 40),
+    "pre": (0.8, 1.0, 0),
+    "blockquote": (1.0, 1.0, 40),
+    "hr": (1.0, 0.5, 0),
+}
+
+# A page is overflowing above this fill ratio and underfilled below the other
+OVERFLOW_RATIO = 1.05
+UNDERFILL_RATIO = 0.5
+
+def _char_width(ch):
+    if ch == " ":
+        return 0.25
+    if ch in NARROW_CHARS:
+        return 0.28
+    if ch in WIDE_CHARS:
+        return 0.85
+    if ch.isupper():
+        return 0.67
+    return 0.45
+
+class _BlockCollector(HTMLParser):
+    """Collect the block elements of rendered markdown with their text."""
+
+    def __init__(self):
+        super().__init__()
+        self.blocks = []
+        self.stack = []
+        self.bold = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("strong", "b"):
+            self.bold += 1
+        elif tag == "br" and self.stack:
+            self.stack[-1]["text"].append("\n")
+        elif tag == "hr":
+            self.blocks.append({"tag": "hr", "text": "", "bold": False, "indent": 0})
+        elif tag in BLOCK_STYLES:
+            indent = sum(BLOCK_STYLES[block["tag"]][2] for block in self.stack)
+            self.stack.append({"tag": tag, "text": [], "bold": False, "indent": indent})
+
+    def handle_endtag(self, tag):
+        if tag in ("strong", "b"):
+            self.bold = max(0, self.bold - 1)
+        elif self.stack and self.stack[-1]["tag"] == tag:
+            block = self.stack.pop()
+            block["text"] = "".join(block["text"])
+            if block["text"].strip() or tag == "pre":
+                self.blocks.append(block)
+
+    def handle_data(self, data):
+        if self.stack:
+            # Newlines are only kept inside <pre>, elsewhere <br> breaks lines
+            if not any(block["tag"] == "pre" for block in self.stack):
+                data = data.replace("\n", " ")
+            self.stack[-1]["text"].append(data)
+            if self.bold:
+                self.stack[-1]["bold"] = True
+
+def _wrap_lines(text, font_px, width_px, monospace=False, bold=False):
+    """Count the lines a block of text wraps to."""
+    if monospace:
+        per_line = max(1, int(width_px / (font_px * MONOSPACE_WIDTH)))
+        return sum(max(1, -(-len(line) // per_line)) for line in text.rstrip("\n").split("\n"))
+
+    scale = font_px * (1.05 if bold else 1.0)
+    space = _char_width(" ") * scale
+    lines = 0
+    for paragraph in text.split("\n"):
+        lines += 1
+        x = 0
+        for word in paragraph.split():
+            word_width = sum(_char_width(ch) for ch in word) * scale
+            if x and x + space + word_width > width_px:
+                lines += 1
+                x = word_width
+            else:
+                x += (space if x else 0) + word_width
+    return lines
+
+def layout_lines(markdown_text, font_size=DEFAULT_FONT_SIZE):
+    """
+    Lay out markdown the way generate_pdf renders it.
+
+    Args:
+        markdown_text (str): Markdown content.
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        list: (line height in px, space above in px) for every rendered line.
+    """
+    collector = _BlockCollector()
+    collector.feed(markdown.markdown(markdown_text or ""))
+    padding = PAGE_PADDING_MM * PX_PER_MM
+    content_width = PAGE_WIDTH_PX - 2 * padding
+
+    lines = []
+    previous_margin = 0
+    for block in collector.blocks:
+        tag = block["tag"]
+        size_em, margin_em, _ = BLOCK_STYLES[tag]
+        font_px = font_size + 4 if tag == "h1" else font_size * size_em
+        margin = margin_em * font_px
+        if tag == "p":
+            line_px = font_px * LINE_HEIGHT
+        else:
+            line_px = font_px * NORMAL_LINE_HEIGHT
+
+        if tag == "hr":
+            count = 1
+            line_px = 2
+        else:
+            count = _wrap_lines(block["text"], font_px, content_width - block["indent"],
+                                monospace=tag == "pre", bold=block["bold"] or tag.startswith("h"))
+
+        # Vertical margins of adjacent blocks collapse
+        space = max(previous_margin, margin)
+        for n in range(count):
+            lines.append((line_px, space if n == 0 else 0))
+        previous_margin = margin
+
+    return lines
+
+def estimate_height(markdown_text, font_size=DEFAULT_FONT_SIZE):
+    """
+    Estimate the rendered height of markdown content, without page breaks.
+
+    Args:
+        markdown_text (str): Markdown content.
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        float: Height in CSS px.
+    """
+    return sum(height + space for height, space in layout_lines(markdown_text, font_size))
+
+def estimate_pages(markdown_text, font_size=DEFAULT_FONT_SIZE):
+    """
+    Predict how many pages generate_pdf renders for markdown content.
+
+    Lines are never split across pages, and the body padding only applies
+    at the top of the first page and the bottom of the last page.
+
+    Args:
+        markdown_text (str): Markdown content.
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        int: Number of rendered pages.
+    """
+    padding = PAGE_PADDING_MM * PX_PER_MM
+    pages = 1
+    y = padding
+    for height, space in layout_lines(markdown_text, font_size):
+        if y + space + height > PAGE_HEIGHT_PX:
+            pages += 1
+            y = height
+        else:
+            y += space + height
+    if y + padding > PAGE_HEIGHT_PX:
+        pages += 1
+    return pages
+
+def page_fill_ratio(page_markdown, font_size=DEFAULT_FONT_SIZE):
+    """
+    Estimate how much of one A4 page a page_markdown fills.
+
+    Args:
+        page_markdown (str): Markdown of a single eBook page.
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        float: Fill ratio, above 1 when the page overflows.
+    """
+    usable = PAGE_HEIGHT_PX - 2 * PAGE_PADDING_MM * PX_PER_MM
+    return estimate_height(page_markdown, font_size) / usable
+
+def words_per_page(font_size=DEFAULT_FONT_SIZE):
+    """
+    Estimate how many words of plain paragraphs fit on one page.
+
+    Args:
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        int: Approximate number of words per page.
+    """
+    usable = PAGE_HEIGHT_PX - 2 * PAGE_PADDING_MM * PX_PER_MM
+    content_width = PAGE_WIDTH_PX - 2 * PAGE_PADDING_MM * PX_PER_MM
+    lines = usable / (font_size * LINE_HEIGHT)
+    # An average English word plus its space is about 2.4 em wide
+    words_per_line = content_width / (font_size * 2.4)
+    return int(lines * words_per_line * 0.9)
+
+def chapter_page_ranges(book_content, font_size=DEFAULT_FONT_SIZE):
+    """
+    Predict the page range of every chapter of the book.
+
+    Args:
+        book_content (list): Chapters as returned by generate_ebook_content.
+        font_size (int, optional): Font size passed to generate_pdf. Default is 20.
+
+    Returns:
+        list: (first page, last page) of each chapter, counting from 1.
+    """
+    ranges = []
+    start = 1
+    for chapter in book_content:
+        chapter_markdown = "".join(page['page_markdown'] for page in chapter)
+        pages = estimate_pages(chapter_markdown, font_size)
+        ranges.append((start, start + pages - 1))
+        start += pages
+    return ranges
@@ -3,11 +3,26 @@
 # Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
 import os
 import re
+import hashlib
 import markdown
 import pdfkit
-from PyPDF2 import PdfMerger
+from PyPDF2 import PdfMerger, PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+)
 
-def generate_pdf(content, output_path, font_size=20):
+# Used to linearize the optimized book for fast web view, skipped if it cannot be imported
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+# Page style used by generate_pdf, also read by the layout estimator
+DEFAULT_FONT_SIZE = 20
+PAGE_PADDING_MM = 20
+LINE_HEIGHT = 1.6
+
+def generate_pdf(content, output_path, font_size=DEFAULT_FONT_SIZE):
     """
     Converts Markdown content into a formatted PDF with full-page text fit.
     
@@ -28,7 +43,7 @@ def generate_pdf(content, output_path, font_size=20):
             body {{
                 font-size: {font_size};
                 margin: 0;
-                padding: 20mm;
+                padding: {PAGE_PADDING_MM}mm;
                 text-align: justify;
             }}
             h1 {{
@@ -36,7 +51,7 @@ def generate_pdf(content, output_path, font_size=20):
                 font-size: {font_size+4};
             }}
             p {{
-                line-height: 1.6;
+                line-height: {LINE_HEIGHT};
             }}
         </style>
     </head>
@@ -146,4 +161,142 @@ def delete_source_pdfs(path_folder, pdf_files):
             else:
                 print(f"File {pdf_path} does not exist")
     except Exception as e:
-        print(f"Error occurred during deletion: {str(e)}") 
\ No newline at end of file
+        print(f"Error occurred during deletion: {str(e)}") 
+
+def _object_digest(obj, hasher=None, seen=None):
+    """
+    Hash a PDF object together with everything it references.
+    
+    Args:
+        obj: PDF object to hash.
+        hasher (optional): Hash object to update. Default is a new SHA-1.
+        seen (set, optional): Indirect objects already hashed, to break cycles.
+        
+    Returns:
+        str: Hex digest of the object.
+    """
+    if hasher is None:
+        hasher = hashlib.sha1()
+    if seen is None:
+        seen = set()
+    
+    if isinstance(obj, IndirectObject):
+        if obj.idnum in seen:
+            hasher.update(f"R{obj.idnum}".encode())
+            return hasher.hexdigest()
+        seen.add(obj.idnum)
+        obj = obj.get_object()
+    
+    if isinstance(obj, StreamObject):
+        hasher.update(b"stream")
+        hasher.update(obj._data)
+    if isinstance(obj, DictionaryObject):
+        hasher.update(b"<<")
+        for key in sorted(obj.keys()):
+            if key == "/Length":
+                continue
+            hasher.update(key.encode())
+            _object_digest(obj.raw_get(key), hasher, seen)
+        hasher.update(b">>")
+    elif isinstance(obj, ArrayObject):
+        hasher.update(b"[")
+        for item in obj:
+            _object_digest(item, hasher, seen)
+        hasher.update(b"]")
+    else:
+        hasher.update(repr(obj).encode())
+    
+    return hasher.hexdigest()
+
+def optimize_pdf(pdf_path, output_path=None):
+    """
+    Reduces the size of a merged book PDF.
+    
+    Identical fonts, XObjects and other page resources repeated across
+    chapters are stored once, content streams are recompressed, and the output is linearized
+    for fast web view when pikepdf is installed.
+    
+    Args:
+        pdf_path (str): Path to the PDF to optimize.
+        output_path (str, optional): Path for the optimized PDF. If None, pdf_path is overwritten.
+        
+    Returns:
+        dict: Sizes before and after, deduplicated objects and whether the output is linearized,
+            or None if the optimization failed.
+    """
+    if output_path is None:
+        output_path = pdf_path
+    temp_path = output_path + ".tmp"
+    
+    try:
+        size_before = os.path.getsize(pdf_path)
+        reader = PdfReader(pdf_path)
+        
+        # Point every page at the first copy of identical fonts, images and
+        # graphics states, so the duplicates are never copied into the new PDF
+        canonical = {}
+        deduplicated = 0
+        for page in reader.pages:
+            resources = page.get("/Resources")
+            if resources is None:
+                continue
+            resources = resources.get_object()
+            for category in ("/Font", "/XObject", "/ExtGState", "/ColorSpace", "/Pattern", "/Shading"):
+                entries = resources.get(category)
+                if entries is None:
+                    continue
+                entries = entries.get_object()
+                for name in list(entries.keys()):
+                    ref = entries.raw_get(name)
+                    if not isinstance(ref, IndirectObject):
+                        continue
+                    first = canonical.setdefault(category + _object_digest(ref), ref)
+                    if first.idnum != ref.idnum:
+                        entries[NameObject(name)] = first
+                        deduplicated += 1
+        
+        # Copy the pages and recompress their content streams
+        writer = PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        for page in writer.pages:
+            contents = page.get("/Contents")
+            if contents is None:
+                continue
+            contents = contents.get_object()
+            streams = contents if isinstance(contents, ArrayObject) else [contents]
+            # Re-encoding already compressed streams only makes them larger
+            if any("/Filter" not in stream.get_object() for stream in streams):
+                page.compress_content_streams()
+        if reader.metadata:
+            writer.add_metadata(reader.metadata)
+        
+        with open(temp_path, "wb") as fout:
+            writer.write(fout)
+        
+        # Linearize for fast web view
+        linearized = False
+        if pikepdf is not None:
+            with pikepdf.open(temp_path) as pdf:
+                pdf.save(output_path, linearize=True, compress_streams=True,
+                         object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            os.remove(temp_path)
+            linearized = True
+        else:
+            os.replace(temp_path, output_path)
+            print("pikepdf is not installed, skipping linearization")
+        
+        size_after = os.path.getsize(output_path)
+        print(f"Optimized {output_path}: {size_before} -> {size_after} bytes")
+        return {
+            "size_before": size_before,
+            "size_after": size_after,
+            "deduplicated_objects": deduplicated,
+            "linearized": linearized,
+        }
+        
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
@@ -0,0 +1,87 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import threading
+
+from .usage import estimate_tokens
+
+# The API rejects context caches smaller than this
+MIN_CACHE_TOKENS = 4096
+
+class PrefixCache:
+    """
+    Provider-side caches of the static prompt prefixes used for one book.
+
+    Every distinct (backend, model, preamble) is cached once, as the system
+    instruction of a provider context cache, and shared by all the sessions
+    that start with it. Preambles below MIN_CACHE_TOKENS, or backends and
+    models without context caching, get no cache and the session folds the
+    preamble into its first message instead.
+
+    Args:
+        ttl (str, optional): Lifetime of a cache, e.g. "3600s". Default is one hour.
+        min_tokens (int, optional): Smallest preamble worth caching. Default is MIN_CACHE_TOKENS.
+    """
+
+    def __init__(self, ttl="3600s", min_tokens=MIN_CACHE_TOKENS):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.names = {}
+        self.unsupported = set()
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def get(self, backend, model, preamble):
+        """
+        Name of the cache holding a preamble, creating it on first use.
+
+        Args:
+            backend: LLM backend the sessions run on.
+            model (str): Model the cache is created for.
+            preamble (str): Static persona and outline text.
+
+        Returns:
+            str: Cache name to pass as cached_content, or None to fold the preamble locally.
+        """
+        key = (backend, model, preamble)
+        with self._lock:
+            if key not in self.names:
+                self.names[key] = self._create(backend, model, preamble)
+            name = self.names[key]
+            if name:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+            return name
+
+    def _create(self, backend, model, preamble):
+        if not getattr(backend, "supports_caching", False) or (backend, model) in self.unsupported:
+            return None
+        if estimate_tokens(preamble) < self.min_tokens:
+            return None
+        try:
+            return backend.create_cache(model, preamble, self.ttl)
+        except Exception as e:
+            print(f"Context caching unavailable for {model}, sending preambles inline: {str(e)}")
+            self.unsupported.add((backend, model))
+            return None
+
+    def clear(self):
+        """Delete every cache created for the book."""
+        with self._lock:
+            names = [(key[0], name) for key, name in self.names.items() if name]
+            self.names = {}
+        for backend, name in names:
+            try:
+                backend.delete_cache(name)
+            except Exception as e:
+                print(f"Error deleting context cache {name}: {str(e)}")
+
+    def report(self):
+        with self._lock:
+            return {
+                "caches": sum(1 for name in self.names.values() if name),
+                "cached_sessions": self.hits,
+                "inline_sessions": self.fallbacks,
+            }
@@ -0,0 +1,184 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import re
+from pydantic import ValidationError
+
+from .hedging import call_hedged, CallTimeout
+
+class ResponseError(Exception):
+    """Raised when a model response cannot be parsed into its schema."""
+
+def repair_json(text):
+    """
+    Cheaply repair common defects in a JSON response.
+
+    Strips Markdown code fences and text around the JSON value, drops
+    trailing commas, and closes strings, arrays and objects left open by a
+    truncated response. A member or literal cut short is dropped.
+
+    Args:
+        text (str): Raw response text.
+
+    Returns:
+        str: The repaired JSON text.
+    """
+    text = (text or "").strip()
+
+    # Remove ```json fences
+    fence = re.match(r"^```[a-zA-Z]*\s*(.*?)\s*(?:```)?$", text, re.S)
+    if fence:
+        text = fence.group(1)
+
+    # Skip anything before the JSON value
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    text = text[min(starts):]
+
+    out = []
+    stack = []
+    # Position in out just after the last "{", "[" or "," outside a string
+    last_sep = 0
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            last_sep = len(out) + 1
+        elif ch == ",":
+            last_sep = len(out)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            last_sep = None
+            if not stack:
+                # Ignore anything after the JSON value
+                return "".join(out)
+            continue
+        out.append(ch)
+
+    # The response was truncated, close whatever is still open
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    else:
+        _strip_partial_literal(out)
+    # Drop an object member whose key or value never arrived
+    if stack and stack[-1] == "}" and last_sep is not None:
+        member = "".join(out[last_sep:]).strip()
+        if ":" not in member or member.endswith(":"):
+            del out[last_sep:]
+    _strip_trailing_comma(out)
+    out.extend(reversed(stack))
+    return "".join(out)
+
+# Bare values that are complete, anything else at the end was cut short
+_LITERAL = re.compile(r"true|false|null|-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+
+def _strip_partial_literal(out):
+    match = re.search(r"[\w.+-]+\s*$", "".join(out))
+    if match and not _LITERAL.fullmatch(match.group().strip()):
+        del out[match.start():]
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+def parse_response(text, schema):
+    """
+    Validate a response against its model, repairing it if needed.
+
+    Args:
+        text (str): Raw response text.
+        schema (type): Pydantic model the response must match.
+
+    Returns:
+        BaseModel: The validated response.
+
+    Raises:
+        ResponseError: If the response is invalid even after repair.
+    """
+    try:
+        return schema.model_validate_json(text or "")
+    except ValidationError:
+        pass
+
+    try:
+        return schema.model_validate_json(repair_json(text))
+    except ValidationError as e:
+        raise ResponseError(f"Invalid {schema.__name__} response: {e.errors()[0]['msg']}") from e
+
+def send_structured(chat, model, message, schema, tracker=None, stage="", chapter=None, retries=2, policy=None):
+    """
+    Send a message and return the response validated against its model.
+
+    Each request runs with a deadline and may be hedged; an invalid
+    response does not win a hedged call. Only a failed call is asked
+    again, at most `retries` times, telling the model what was wrong.
+
+    Args:
+        chat (ChatSession): Session to send the message to.
+        model (str): Model name of the chat, used for pricing.
+        message (str): Message to send.
+        schema (type): Pydantic model used as response schema and for validation.
+        tracker (UsageTracker, optional): Tracker to record usage on.
+        stage (str, optional): Stage or role the call belongs to.
+        chapter (int, optional): Chapter index the call belongs to.
+        retries (int, optional): Number of times to re-ask after an invalid or timed out response. Default is 2.
+        policy (HedgePolicy, optional): Deadline and hedging policy. Default is DEFAULT_POLICY.
+
+    Returns:
+        BaseModel: The validated response.
+
+    Raises:
+        ResponseError: If no valid response was received.
+        CallTimeout: If the last attempt did not return within the deadline.
+    """
+    config = {
+        "response_mime_type": "application/json",
+        "response_schema": schema,
+    }
+    request = message
+
+    def attempt(hedge):
+        response = chat.generate(request, config)
+        if tracker is not None:
+            tracker.record(f"{stage}_hedge" if hedge else stage, model, request, response, chapter,
+                           getattr(chat.backend, "name", "gemini"))
+        return response, parse_response(response.text, schema)
+
+    for n in range(retries + 1):
+        try:
+            response, result = call_hedged(attempt, stage or model, policy, tracker)
+        except CallTimeout as e:
+            print(f"Timed out waiting for {stage or model} (attempt {n + 1}/{retries + 1})")
+            error = e
+            continue
+        except ResponseError as e:
+            print(f"Invalid response from {stage or model} (attempt {n + 1}/{retries + 1}): {str(e)}")
+            error = e
+            request = (f"{message}\n\nA previous answer to this could not be read: {str(e)}\n"
+                       f"Reply with only the complete JSON object for {schema.__name__}.")
+            continue
+        chat.commit(request, response.text)
+        return result
+
+    raise error
@@ -0,0 +1,138 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Stage:
+    """
+    A step of the book pipeline.
+
+    The stage function is called with the results of its dependencies as
+    keyword arguments, named after the stages they come from.
+
+    Args:
+        name (str): Unique stage name.
+        func (callable): Function that runs the stage.
+        deps (list, optional): Names of the stages whose results it needs.
+    """
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+def run_stages(stages, max_workers=4):
+    """
+    Run a dependency graph of stages, starting each as soon as its inputs exist.
+
+    If a stage fails no new stages are started, the running ones are
+    allowed to finish and the first error is raised, with the schedule
+    report of the partial run attached as its `schedule` attribute.
+
+    Args:
+        stages (list): Stage objects making up the graph.
+        max_workers (int, optional): Number of stages that may run at once. Default is 4.
+
+    Returns:
+        tuple: (results by stage name, schedule report with the critical path)
+
+    Raises:
+        ValueError: If the graph has unknown dependencies or a cycle.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    results = {}
+    timings = {}
+    pending = dict(by_name)
+    running = {}
+    error = None
+    failed_stage = None
+    origin = time.perf_counter()
+
+    def run(stage, inputs):
+        start = time.perf_counter()
+        try:
+            return stage.func(**inputs)
+        finally:
+            timings[stage.name] = (start - origin, time.perf_counter() - origin)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if error is None:
+                ready = [stage for stage in pending.values() if all(dep in results for dep in stage.deps)]
+                for stage in ready:
+                    del pending[stage.name]
+                    inputs = {dep: results[dep] for dep in stage.deps}
+                    running[executor.submit(run, stage, inputs)] = stage.name
+
+            if not running:
+                if error is None and pending:
+                    raise ValueError(f"Stages can never run, check for a cycle: {sorted(pending)}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"Stage {name} failed: {str(e)}")
+                    if error is None:
+                        error = e
+                        failed_stage = name
+
+    report = schedule_report(by_name, timings)
+    print(f"Critical path: {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']}s)")
+    if error is not None:
+        report["failed_stage"] = failed_stage
+        report["error"] = f"{type(error).__name__}: {str(error)}"
+        error.schedule = report
+        raise error
+    return results, report
+
+def schedule_report(stages, timings):
+    """
+    Summarise a run of the stage graph.
+
+    The critical path is found by walking back from the stage that finished
+    last, always through the dependency that finished last.
+
+    Args:
+        stages (dict): Stage objects by name.
+        timings (dict): (start, end) in seconds of every stage that ran.
+
+    Returns:
+        dict: Stage timings, wall time, total stage time and the critical path.
+    """
+    report = {
+        "stages": {
+            name: {
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "duration": round(end - start, 3),
+                "deps": stages[name].deps,
+            }
+            for name, (start, end) in timings.items()
+        },
+        "wall_seconds": round(max((end for _, end in timings.values()), default=0), 3),
+        "stage_seconds": round(sum(end - start for start, end in timings.values()), 3),
+        "critical_path": [],
+        "critical_path_seconds": 0,
+    }
+
+    name = max(timings, key=lambda n: timings[n][1], default=None)
+    path = []
+    while name is not None:
+        path.append(name)
+        deps = [dep for dep in stages[name].deps if dep in timings]
+        name = max(deps, key=lambda n: timings[n][1], default=None)
+    path.reverse()
+
+    report["critical_path"] = path
+    report["critical_path_seconds"] = round(sum(timings[n][1] - timings[n][0] for n in path), 3)
+    return report
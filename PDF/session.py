@@ -0,0 +1,60 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+
+class ChatSession:
+    """
+    A multi-turn conversation whose history is kept locally.
+
+    Unlike a provider chat, sending a request does not change the history
+    until the response is committed, so the same turn can be sent twice
+    (e.g. as a hedge) and only the winning response is kept.
+
+    A preamble (the role's persona and any static context) is sent from a
+    provider cache when `cache` has one for it, otherwise it is folded into
+    the first message of the conversation.
+
+    Args:
+        backend: LLM backend, any object with a generate(model, contents, config) method.
+        model (str): Model name.
+        role (str, optional): Name of the role in the pipeline, e.g. "writer".
+        preamble (str, optional): Static text the conversation starts with.
+        cache (PrefixCache, optional): Cache to look the preamble up in.
+    """
+
+    def __init__(self, backend, model, role="", preamble="", cache=None):
+        self.backend = backend
+        self.model = model
+        self.role = role
+        self.preamble = preamble
+        self.cached_content = cache.get(backend, model, preamble) if cache is not None and preamble else None
+        self.history = []
+
+    def _prepare(self, message):
+        if self.preamble and not self.cached_content and not self.history:
+            return f"{self.preamble}\n\n{message}"
+        return message
+
+    def generate(self, message, config=None):
+        """
+        Send the history plus a new message, without recording the turn.
+
+        Args:
+            message (str): Message to send.
+            config (dict, optional): Generation config for the call.
+
+        Returns:
+            The model response.
+        """
+        contents = self.history + [{"role": "user", "parts": [{"text": self._prepare(message)}]}]
+        if self.cached_content:
+            config = dict(config or {}, cached_content=self.cached_content)
+        return self.backend.generate(self.model, contents, config)
+
+    def commit(self, message, response_text):
+        """Record a message and its response in the history."""
+        self.history.append({"role": "user", "parts": [{"text": self._prepare(message)}]})
+        self.history.append({"role": "model", "parts": [{"text": response_text or ""}]})
+
+    def __repr__(self):
+        return self.role.upper() or self.model
@@ -0,0 +1,322 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import re
+import threading
+
+# USD per 1M tokens as (input, output)
+MODEL_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# Backends whose calls cost nothing, e.g. a model running on this machine
+FREE_BACKENDS = {"local", "stub"}
+
+# Input tokens read from a context cache are billed at this share of the input price
+CACHED_INPUT_RATE = 0.25
+
+class BudgetExceeded(Exception):
+    """Raised when a book goes over its hard token or cost budget."""
+
+class BookBudget:
+    """
+    Token and cost limits for a single book.
+
+    Once usage passes `degrade_at` of a limit the pipeline switches to the
+    cheaper page strategy and clamps chapter pages; once a limit is reached
+    generation is aborted.
+
+    Args:
+        max_tokens (int, optional): Hard limit on total tokens for the book.
+        max_cost (float, optional): Hard limit on total cost in USD for the book.
+        degrade_at (float, optional): Fraction of a limit at which to degrade. Default is 0.8.
+        max_total_pages (int, optional): Upper bound for FinalRecipe.Totalpages.
+        degraded_chapter_pages (int, optional): Page cap for chapters written while degraded. Default is 1.
+    """
+
+    def __init__(self, max_tokens=None, max_cost=None, degrade_at=0.8,
+                 max_total_pages=None, degraded_chapter_pages=1):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.degrade_at = degrade_at
+        self.max_total_pages = max_total_pages
+        self.degraded_chapter_pages = degraded_chapter_pages
+
+    def to_dict(self):
+        return {
+            "max_tokens": self.max_tokens,
+            "max_cost": self.max_cost,
+            "degrade_at": self.degrade_at,
+            "max_total_pages": self.max_total_pages,
+            "degraded_chapter_pages": self.degraded_chapter_pages,
+        }
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of a piece of text locally.
+
+    Used when a response carries no usage metadata. Words count as about
+    1.3 tokens and punctuation/markup symbols as one token each.
+
+    Args:
+        text (str): Text to estimate.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+    if not text:
+        return 0
+    words = len(re.findall(r"\w+", text))
+    symbols = len(re.findall(r"[^\w\s]", text))
+    return int(words * 1.3 + symbols)
+
+class UsageTracker:
+    """
+    Meters token usage and cost of every model call for one book.
+
+    Usage is rolled up per stage, per chapter and for the whole book, and
+    checked against an optional BookBudget.
+
+    Args:
+        budget (BookBudget, optional): Budget to enforce. Default is no budget.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.stages = {}
+        self.chapters = {}
+        self.events = []
+        self.unpriced = set()
+        self._lock = threading.Lock()
+
+    def record(self, stage, model, prompt, response, chapter=None, backend="gemini"):
+        """
+        Record the usage of a single model call.
+
+        Token counts are taken from the response usage metadata, falling back
+        to a local estimate of the prompt and response text. Input tokens
+        served from a context cache are priced at CACHED_INPUT_RATE. Calls on
+        FREE_BACKENDS cost nothing; a paid model missing from MODEL_PRICES
+        is priced like the most expensive known model, with a warning, so
+        it cannot slip past the cost budget.
+
+        Args:
+            stage (str): Pipeline stage or role, e.g. "idea", "writer".
+            model (str): Model name used for the call.
+            prompt (str): Prompt text sent to the model.
+            response: Model response object.
+            chapter (int, optional): Chapter index the call belongs to.
+            backend (str, optional): Name of the backend that served the call. Default is "gemini".
+
+        Returns:
+            tuple: (input tokens, output tokens)
+        """
+        usage = getattr(response, "usage_metadata", None)
+        input_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if input_tokens is None:
+            input_tokens = estimate_tokens(prompt)
+        if output_tokens is None:
+            output_tokens = estimate_tokens(getattr(response, "text", "") or "")
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+
+        input_price, output_price = self._prices(backend, model)
+        cost = ((input_tokens - cached_tokens) * input_price
+                + cached_tokens * input_price * CACHED_INPUT_RATE
+                + output_tokens * output_price) / 1_000_000
+
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached_tokens
+            self.output_tokens += output_tokens
+            self.cost += cost
+            buckets = [self.stages.setdefault(stage, self._empty_bucket())]
+            if chapter is not None:
+                buckets.append(self.chapters.setdefault(str(chapter), self._empty_bucket()))
+            for bucket in buckets:
+                bucket["calls"] += 1
+                bucket["input_tokens"] += input_tokens
+                bucket["cached_tokens"] += cached_tokens
+                bucket["output_tokens"] += output_tokens
+                bucket["cost"] += cost
+
+        return input_tokens, output_tokens
+
+    def _prices(self, backend, model):
+        if backend in FREE_BACKENDS:
+            return 0.0, 0.0
+        if model in MODEL_PRICES:
+            return MODEL_PRICES[model]
+        with self._lock:
+            warn = model not in self.unpriced
+            self.unpriced.add(model)
+        if warn:
+            print(f"Warning: no price for {backend} model {model}, metering it at the highest known price")
+        return max(MODEL_PRICES.values())
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+    def hedge_share(self):
+        """
+        Share of the book's tokens or cost spent on hedged duplicate calls.
+
+        Returns:
+            float: The larger of the token and cost shares, 0 before any usage.
+        """
+        with self._lock:
+            hedges = [bucket for stage, bucket in self.stages.items() if stage.endswith("_hedge")]
+            tokens = sum(bucket["input_tokens"] + bucket["output_tokens"] for bucket in hedges)
+            cost = sum(bucket["cost"] for bucket in hedges)
+            shares = [tokens / self.total_tokens if self.total_tokens else 0.0,
+                      cost / self.cost if self.cost else 0.0]
+        return max(shares)
+
+    def status(self):
+        """
+        Check usage against the budget.
+
+        Returns:
+            str: "ok", "degrade" or "abort".
+        """
+        if self.budget is None:
+            return "ok"
+
+        used = []
+        if self.budget.max_tokens:
+            used.append(self.total_tokens / self.budget.max_tokens)
+        if self.budget.max_cost:
+            used.append(self.cost / self.budget.max_cost)
+        ratio = max(used, default=0)
+
+        if ratio >= 1:
+            return "abort"
+        if ratio >= self.budget.degrade_at:
+            return "degrade"
+        return "ok"
+
+    def check(self, stage):
+        """
+        Enforce the budget before starting a stage.
+
+        Args:
+            stage (str): Stage that is about to run.
+
+        Returns:
+            str: "ok" or "degrade".
+
+        Raises:
+            BudgetExceeded: If the hard budget has been reached.
+        """
+        status = self.status()
+        if status == "abort":
+            self.note("abort", stage)
+            raise BudgetExceeded(f"Budget exceeded before {stage}: {self.total_tokens} tokens, ${self.cost:.4f}")
+        return status
+
+    def clamp_recipe(self, recipe):
+        """
+        Clamp the chapter pages of an eBook recipe to the budget's total page limit.
+
+        Every chapter keeps at least one page and the rest of the limit is
+        shared out in proportion to the pages it asked for. When there are
+        more chapters than pages, the chapters past the limit are merged
+        into the last one that is kept.
+
+        Args:
+            recipe (dict): eBook idea with title, contents, and Totalpages.
+
+        Returns:
+            dict: The same recipe with Chapter pages scaled down if needed.
+        """
+        if self.budget is None or not self.budget.max_total_pages:
+            return recipe
+
+        limit = self.budget.max_total_pages
+        chapters = recipe['contents']
+        total = sum(chapter['pages'] for chapter in chapters)
+        if total <= limit:
+            return recipe
+
+        if len(chapters) > limit:
+            kept, merged = chapters[:limit], chapters[limit:]
+            kept[-1]['content'] += " " + " ".join(f"{chapter['title']}: {chapter['content']}" for chapter in merged)
+            kept[-1]['pages'] += sum(chapter['pages'] for chapter in merged)
+            recipe['contents'] = chapters = kept
+            self.note("merge_chapters", "idea", f"{len(kept) + len(merged)} -> {len(kept)} chapters")
+
+        # One page each, then the remaining pages by largest remainder
+        extra = [chapter['pages'] - 1 for chapter in chapters]
+        spare = limit - len(chapters)
+        shares = [pages * spare / sum(extra) if sum(extra) else 0 for pages in extra]
+        allotted = [int(share) for share in shares]
+        by_remainder = sorted(range(len(chapters)), key=lambda n: shares[n] - allotted[n], reverse=True)
+        for n in by_remainder[:spare - sum(allotted)]:
+            allotted[n] += 1
+        for chapter, pages in zip(chapters, allotted):
+            chapter['pages'] = 1 + pages
+
+        recipe['Totalpages'] = sum(chapter['pages'] for chapter in chapters)
+        self.note("clamp_total_pages", "idea", f"{total} -> {recipe['Totalpages']} pages")
+        return recipe
+
+    def clamp_chapter_pages(self, chapter, index):
+        """
+        Clamp a chapter's pages to the degraded page limit.
+
+        Args:
+            chapter (dict): Chapter with title, content, and pages.
+            index (int): Chapter index.
+
+        Returns:
+            int: The number of pages to write for the chapter.
+        """
+        pages = chapter['pages']
+        limit = self.budget.degraded_chapter_pages if self.budget else pages
+        if pages > limit:
+            self.note("clamp_chapter_pages", "content", f"chapter {index}: {pages} -> {limit} pages")
+            return limit
+        return pages
+
+    def note(self, action, stage, detail=""):
+        """Record a budget action taken by the pipeline."""
+        with self._lock:
+            self.events.append({"action": action, "stage": stage, "detail": detail,
+                                "tokens": self.total_tokens, "cost": round(self.cost, 6)})
+        print(f"Budget: {action} at {stage} {detail}".rstrip())
+
+    def report(self):
+        """
+        Build the usage section of the book report.
+
+        Returns:
+            dict: Totals, per-stage and per-chapter usage, and budget actions.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": self.total_tokens,
+                "cost": round(self.cost, 6),
+                "status": self.status(),
+                "budget": self.budget.to_dict() if self.budget else None,
+                "stages": self.stages,
+                "chapters": self.chapters,
+                "events": self.events,
+                "unpriced_models": sorted(self.unpriced),
+            }
+
+    @staticmethod
+    def _empty_bucket():
+        return {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost": 0.0}
@@ -3,10 +3,15 @@
 # Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
 import os
 import re
+import json
 import shutil
+import threading
 from cairosvg import svg2png
 from PIL import Image
 
+# Stages of a book may update its report concurrently
+_report_lock = threading.Lock()
+
 def convert_svg_to_png(svg_path, output_path=None):
     """
     Convert an SVG file to PNG format.
@@ -150,4 +155,33 @@ def delete_file(file_path):
         print(f"Successfully deleted {file_path}")
         
     except Exception as e:
-        print(f"Error occurred: {str(e)}") 
\ No newline at end of file
+        print(f"Error occurred: {str(e)}") 
+
+def update_book_report(path_folder, section, data):
+    """
+    Write a section of the book's report.json, keeping the other sections.
+    
+    Args:
+        path_folder (str): Path to the book folder.
+        section (str): Name of the report section, e.g. "usage".
+        data (dict): Content of the section.
+        
+    Returns:
+        None
+    """
+    report_path = os.path.join(path_folder, "report.json")
+    
+    try:
+        with _report_lock:
+            report = {}
+            if os.path.exists(report_path):
+                with open(report_path, "r") as f:
+                    report = json.load(f)
+            
+            report[section] = data
+            
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+        
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
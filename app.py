@@ -14,12 +14,14 @@ from PDF.utils import (
     convert_png_to_jpg,
     create_valid_folder,
     copy_copyright_file,
-    delete_file
+    delete_file,
+    update_book_report
 )
 from PDF.pdf_generator import (
     generate_pdf,
     create_book_pdf,
-    delete_source_pdfs
+    delete_source_pdfs,
+    optimize_pdf
 )
 from PDF.content_generator import (
     generate_ebook_idea,
@@ -27,6 +29,13 @@ from PDF.content_generator import (
     generate_ebook_content,
     generate_content_page
 )
+from PDF.epub_generator import generate_epub
+from PDF.layout import chapter_page_ranges
+from PDF.scheduler import Stage, run_stages
+from PDF.hedging import DEFAULT_POLICY, CallTimeout
+from PDF.responses import ResponseError
+from PDF.usage import BookBudget, UsageTracker, BudgetExceeded
+from PDF.backends import routes_from_env
 
 # List of book prompts
 prompts = [
@@ -108,6 +117,31 @@ prompts = [
     "Write a book about 'Prophecy of the Moon & Star'"
 ]
 
+# Errors that stop one book, the next prompt is still run
+BOOK_ERRORS = (BudgetExceeded, ResponseError, CallTimeout)
+
+def _env_number(name, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+def book_budget():
+    """
+    Build the per-book budget from the environment.
+    
+    Reads BOOK_MAX_TOKENS, BOOK_MAX_COST, BOOK_MAX_PAGES and BOOK_DEGRADE_AT.
+    
+    Returns:
+        BookBudget: The budget, or None if no limit is configured.
+    """
+    max_tokens = _env_number("BOOK_MAX_TOKENS", int)
+    max_cost = _env_number("BOOK_MAX_COST", float)
+    max_total_pages = _env_number("BOOK_MAX_PAGES", int)
+    if not (max_tokens or max_cost or max_total_pages):
+        return None
+    return BookBudget(max_tokens=max_tokens, max_cost=max_cost,
+                      degrade_at=_env_number("BOOK_DEGRADE_AT", float) or 0.8,
+                      max_total_pages=max_total_pages)
+
 def main():
     """
     Main function to generate eBooks based on prompts.
@@ -115,9 +149,19 @@ def main():
     for prompt_ in prompts:
         input("Press Enter to continue...")
         
-        # Generate eBook idea
-        data = generate_ebook_idea(prompt_)
+        tracker = UsageTracker(book_budget())
+        latency_start = DEFAULT_POLICY.counters()
         
+        # Generate eBook idea
+        try:
+            data = generate_ebook_idea(prompt_, tracker=tracker)
+        except BOOK_ERRORS as e:
+            print(f"Aborted idea for {prompt_}: {str(e)}")
+            # There is no book folder yet, report under the prompt instead
+            path_folder = create_valid_folder(prompt_, os.path.join("book", "aborted"))
+            write_run_report(path_folder, tracker, latency_start, "idea", e)
+            continue
+
         # Create folder for the eBook
         path_folder = create_valid_folder(data['title'])
         
@@ -125,26 +169,81 @@ def main():
         with open(f"{path_folder}/data.json", "w") as f:
             json.dump(data, f)
         
-        # Generate eBook content
-        book_content = generate_ebook_content("eBookAura", data)
+        error = None
+        try:
+            create_book_files(data, path_folder, tracker)
+        except BOOK_ERRORS as e:
+            print(f"Aborted {data['title']}: {str(e)}")
+            error = e
+        finally:
+            write_run_report(path_folder, tracker, latency_start, "book", error)
+
+def write_run_report(path_folder, tracker, latency_start, stage, error=None):
+    """
+    Write the usage, latency and routes of a book run to its report.json.
+    
+    Args:
+        path_folder (str): Path to the book folder.
+        tracker (UsageTracker): Tracker of the run.
+        latency_start (dict): Latency counters taken when the run started.
+        stage (str): Part of the run that was reached, "idea" or "book".
+        error (Exception, optional): Error that stopped the run.
         
+    Returns:
+        None
+    """
+    update_book_report(path_folder, "usage", tracker.report())
+    update_book_report(path_folder, "latency", DEFAULT_POLICY.report(since=latency_start))
+    update_book_report(path_folder, "routes", routes_from_env())
+    if error is not None:
+        update_book_report(path_folder, "error", {"stage": stage, "type": type(error).__name__, "message": str(error)})
+
+def create_book_files(data, path_folder, tracker):
+    """
+    Generate the content, PDF, EPUB and cover of a single eBook.
+    
+    The work is run as a graph of stages, so the cover is made while the
+    chapters are being written and the contents page while the chapters
+    are rendering. The schedule and its critical path go to report.json.
+    
+    Args:
+        data (dict): eBook idea with title, contents, and total pages.
+        path_folder (str): Path to the book folder.
+        tracker (UsageTracker): Tracker for token usage and budget.
+        
+    Returns:
+        None
+    """
+    book_name = os.path.basename(path_folder)
+    
+    def content():
+        # Generate eBook content
+        return generate_ebook_content("eBookAura", data, tracker=tracker)
+    
+    def chapter_pdfs(content):
         # Generate chapter PDFs
-        c = 0
         i = 0
-        for chapter in book_content:
+        for c, chapter in enumerate(content, start=1):
             chapter_content = ""
-            c += 1
             for page in chapter:
                 i += 1
                 print(f"Chapter: {c} Page: {i}")
                 chapter_content += page['page_markdown']
             generate_pdf(chapter_content, f"{path_folder}/{c}.pdf")
         print(path_folder)
-        
-        # Generate content page
-        content_page = generate_content_page(str(book_content), 24)
+    
+    def contents_page(content):
+        # Generate content page from the predicted page ranges
+        page_ranges = chapter_page_ranges(content)
+        update_book_report(path_folder, "layout", {"chapter_pages": page_ranges})
+        contents_prompt = "\n".join(
+            f"Chapter {n}: {chapter['title']} - Pg. {first}-{last}"
+            for n, (chapter, (first, last)) in enumerate(zip(data['contents'], page_ranges), start=1)
+        )
+        content_page = generate_content_page(contents_prompt, 24, tracker=tracker)
         generate_pdf(content_page, f"{path_folder}/contents.pdf", 22)
-        
+    
+    def book_pdf(chapter_pdfs, contents_page):
         # Copy copyright file
         copy_copyright_file(path_folder)
         
@@ -152,12 +251,19 @@ def main():
         success, pdf_files = create_book_pdf(path_folder)
         if success:
             delete_source_pdfs(path_folder, pdf_files)
-        
-        # Generate cover
-        cover_page_svg_code = generate_cover_svg(data['title'], "eBookAura", str(data))
+            
+            # Shrink the merged book and record the sizes
+            optimization = optimize_pdf(os.path.join(path_folder, f"{book_name}.pdf"))
+            if optimization:
+                update_book_report(path_folder, "pdf_optimization", optimization)
+    
+    def cover_svg():
+        # Generate cover, it only needs the idea
+        cover_page_svg_code = generate_cover_svg(data['title'], "eBookAura", str(data), tracker=tracker)
         with open(f"{path_folder}/cover.svg", "w") as f:
             f.write(cover_page_svg_code)
-        
+    
+    def cover_jpg(cover_svg):
         # Convert cover to PNG and JPG
         convert_svg_to_png(f"{path_folder}/cover.svg", f"{path_folder}/cover.png")
         convert_png_to_jpg(f"{path_folder}/cover.png", f"{path_folder}/cover.jpg")
@@ -165,6 +271,34 @@ def main():
         # Delete intermediate files
         delete_file(f"{path_folder}/cover.svg")
         delete_file(f"{path_folder}/cover.png")
+    
+    def epub(content, cover_jpg):
+        # Generate EPUB from the chapter markdown
+        generate_epub(data['title'], "eBookAura", content,
+                      os.path.join(path_folder, f"{book_name}.epub"),
+                      [chapter['title'] for chapter in data['contents']],
+                      f"{path_folder}/cover.jpg")
+    
+    stages = [
+        Stage("content", content),
+        Stage("chapter_pdfs", chapter_pdfs, ["content"]),
+        Stage("contents_page", contents_page, ["content"]),
+        Stage("book_pdf", book_pdf, ["chapter_pdfs", "contents_page"]),
+        Stage("cover_svg", cover_svg),
+        Stage("cover_jpg", cover_jpg, ["cover_svg"]),
+        Stage("epub", epub, ["content", "cover_jpg"]),
+    ]
+    
+    schedule = None
+    try:
+        _, schedule = run_stages(stages)
+    except Exception as e:
+        # Failed runs keep the timings up to the failure
+        schedule = getattr(e, "schedule", None)
+        raise
+    finally:
+        if schedule is not None:
+            update_book_report(path_folder, "schedule", schedule)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import time
+import pytest
+
+from PDF.backends import StubBackend
+from PDF.hedging import HedgePolicy, CallTimeout
+from PDF.models import eBookRecipe
+from PDF.responses import send_structured
+from PDF.session import ChatSession
+from PDF.usage import UsageTracker
+
+def _ok(model, contents, config):
+    return '{"response": "ok"}'
+
+def test_hedge_wins_over_stalled_call():
+    policy = HedgePolicy(deadline=5, min_samples=5, max_hedge_ratio=0.5)
+    tracker = UsageTracker()
+    # Five fast calls fill the histogram, the sixth stalls and its hedge returns at once
+    chat = ChatSession(StubBackend(_ok, [0.01] * 5 + [3, 0.01]), "stub", "writer")
+    for _ in range(5):
+        send_structured(chat, "stub", "Write a page", eBookRecipe, tracker=tracker, stage="writer", policy=policy)
+
+    start = time.perf_counter()
+    result = send_structured(chat, "stub", "Write a page", eBookRecipe, tracker=tracker, stage="writer", policy=policy)
+
+    assert result.response == "ok"
+    assert time.perf_counter() - start < 1
+    assert policy.hedge_wins == 1
+    assert "writer_hedge" in tracker.report()["stages"]
+
+def test_deadline_fires():
+    policy = HedgePolicy(deadline=0.2)
+    chat = ChatSession(StubBackend(_ok, [1]), "stub", "writer")
+
+    start = time.perf_counter()
+    with pytest.raises(CallTimeout):
+        send_structured(chat, "stub", "Write a page", eBookRecipe, stage="writer", retries=0, policy=policy)
+
+    assert time.perf_counter() - start < 0.5
+    assert policy.report()["timeouts"] == 1
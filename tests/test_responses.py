@@ -0,0 +1,45 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+import json
+import pytest
+
+from PDF.models import HeadRecipe, eBookRecipPage
+from PDF.responses import ResponseError, repair_json, parse_response
+
+@pytest.mark.parametrize("text, expected", [
+    # Code fences and text around the value
+    ('```json\n{"response": "ok"}\n```', {"response": "ok"}),
+    ('Here you go: {"response": "ok"} Hope it helps!', {"response": "ok"}),
+    # Trailing commas
+    ('{"response": "ok",}', {"response": "ok"}),
+    ('{"pages": [1, 2, ], }', {"pages": [1, 2]}),
+    # Truncated strings, arrays and members
+    ('{"response": "half a sent', {"response": "half a sent"}),
+    ('{"response": "ends on \\', {"response": "ends on "}),
+    ('{"pages": [{"page_markdown": "a"}, {"page_', {"pages": [{"page_markdown": "a"}, {}]}),
+    ('{"response": "ok", "isBookIdeaConformed":', {"response": "ok"}),
+    # Truncated literals
+    ('{"response": "x", "isBookIdeaConformed": tr', {"response": "x"}),
+    ('{"flags": [true, fal', {"flags": [True]}),
+    ('{"pages": [1, 2, 3.', {"pages": [1, 2]}),
+    ('{"response": "x", "done": null', {"response": "x", "done": None}),
+])
+def test_repair_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+def test_parse_response_repairs_truncated_response():
+    text = '```json\n{"response": "done", "chapter_markdown": [{"page_markdown": "# One"}, {"page_markdown": "# Tw'
+    result = parse_response(text, eBookRecipPage)
+    assert result.response == "done"
+    assert [page.page_markdown for page in result.chapter_markdown] == ["# One", "# Tw"]
+
+    result = parse_response('{"response": "Looks good", "isBookIdeaConformed": tr', HeadRecipe)
+    assert result.response == "Looks good"
+    assert result.isBookIdeaConformed is False
+
+def test_parse_response_raises_when_beyond_repair():
+    with pytest.raises(ResponseError):
+        parse_response('{"isBookIdeaConformed": true', HeadRecipe)
+    with pytest.raises(ResponseError):
+        parse_response("I cannot help with that.", HeadRecipe)
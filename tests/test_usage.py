@@ -0,0 +1,63 @@
+# Copyright (c) 2025 Swaraj Puppalwar (UltronTheAI)
+# Licensed under the MIT License. See LICENSE file in the project root for full license information.
+# Project: https://github.com/UltronTheAI/eBook-Generator-AI-Agent
+from types import SimpleNamespace
+import pytest
+
+from PDF.usage import BookBudget, UsageTracker, BudgetExceeded
+
+def _recipe(*pages):
+    return {
+        "title": "Book",
+        "contents": [{"title": f"Chapter {n}", "content": f"About {n}", "pages": p}
+                     for n, p in enumerate(pages, start=1)],
+        "Totalpages": sum(pages),
+    }
+
+def _actions(tracker):
+    return [event["action"] for event in tracker.events]
+
+def test_clamp_recipe_splits_by_largest_remainder():
+    tracker = UsageTracker(BookBudget(max_total_pages=10))
+    recipe = tracker.clamp_recipe(_recipe(10, 6, 4))
+
+    # One page each, then 7 spare pages shared 3.71 / 2.06 / 1.24
+    assert [chapter["pages"] for chapter in recipe["contents"]] == [5, 3, 2]
+    assert recipe["Totalpages"] == 10
+    assert _actions(tracker) == ["clamp_total_pages"]
+
+def test_clamp_recipe_keeps_recipe_within_limit():
+    tracker = UsageTracker(BookBudget(max_total_pages=10))
+    recipe = tracker.clamp_recipe(_recipe(3, 3))
+
+    assert [chapter["pages"] for chapter in recipe["contents"]] == [3, 3]
+    assert tracker.events == []
+
+def test_clamp_recipe_merges_chapters_past_page_limit():
+    tracker = UsageTracker(BookBudget(max_total_pages=2))
+    recipe = tracker.clamp_recipe(_recipe(2, 1, 3, 1))
+
+    chapters = recipe["contents"]
+    assert [chapter["title"] for chapter in chapters] == ["Chapter 1", "Chapter 2"]
+    assert "Chapter 3: About 3" in chapters[1]["content"]
+    assert "Chapter 4: About 4" in chapters[1]["content"]
+    assert [chapter["pages"] for chapter in chapters] == [1, 1]
+    assert recipe["Totalpages"] == 2
+    assert _actions(tracker) == ["merge_chapters", "clamp_total_pages"]
+
+def test_check_degrades_then_aborts():
+    tracker = UsageTracker(BookBudget(max_tokens=100, degrade_at=0.8))
+    usage = lambda tokens: SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=tokens, candidates_token_count=0, cached_content_token_count=0))
+
+    tracker.record("idea", "gemini-2.0-flash", "", usage(50))
+    assert tracker.check("content") == "ok"
+
+    tracker.record("writer", "gemini-2.0-flash", "", usage(30))
+    assert tracker.check("content") == "degrade"
+
+    tracker.record("writer", "gemini-2.0-flash", "", usage(20))
+    with pytest.raises(BudgetExceeded):
+        tracker.check("content")
+    assert tracker.events[-1]["action"] == "abort"
+    assert tracker.report()["status"] == "abort"